@@ -0,0 +1,1466 @@
+"""Benchmarks for the Document Tutor API.
+
+Run one case at a time so peak memory numbers are not polluted by earlier
+cases, e.g. ``python benchmark.py csv --rows 1000000``. Every case prints a
+single JSON object with its measurements.
+
+``python benchmark.py load --scale 100000`` starts the API against
+fake_gemini.py on a freshly seeded database and drives a realistic request
+mix; results are written to benchmarks/results/<commit>.json and two runs
+can be diffed with ``python benchmark.py compare OLD.json NEW.json``.
+
+``python benchmark.py shards`` measures review write throughput from several
+processes with SHARD_MODE=hash at 1, 2, 4 and 8 shards, with every commit
+holding its write lock for --commit-latency-ms as a syncing disk would.
+
+``python benchmark.py db-executor`` is also a check: it drives concurrent
+reads, writes and one slow query through DatabaseExecutor, then fills a
+small executor until it refuses work, and exits 1 listing the failed
+checks if any write hit "database is locked", the event loop stalled
+behind the slow query, or the 503 backpressure did not fire.
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import uuid
+from collections import defaultdict
+from datetime import datetime
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def bench_csv(args):
+    """Extract text from a synthetic CSV and report time and peak RSS"""
+    workdir = tempfile.mkdtemp(prefix="bench-csv-")
+    path = os.path.join(workdir, "rows.csv")
+    with open(path, "w") as file:
+        file.write("id,student,score,category,notes\n")
+        for i in range(args.rows):
+            file.write(f"{i},student {i},{i % 100}.5,cat{i % 7},free text note {i}\n")
+
+    sys.path.insert(0, REPO_DIR)
+    os.chdir(workdir)
+    import main
+
+    rss_before = peak_rss_mb()
+    start = time.perf_counter()
+    text = main.process_csv(path)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "case": "csv",
+        "rows": args.rows,
+        "file_mb": round(os.path.getsize(path) / (1024 * 1024), 1),
+        "seconds": round(elapsed, 3),
+        "output_chars": len(text),
+        "rss_before_mb": round(rss_before, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def bench_txt(args):
+    """Stream a large text file through the TXT extractor and splitter"""
+    workdir = tempfile.mkdtemp(prefix="bench-txt-")
+    path = os.path.join(workdir, "large.txt")
+    line = "The mitochondria is the powerhouse of the cell. " * 20 + "\n"
+    block = line * max(1, (1024 * 1024) // len(line))
+    with open(path, "w") as file:
+        for _ in range(args.mb):
+            file.write(block)
+
+    sys.path.insert(0, REPO_DIR)
+    os.chdir(workdir)
+    import main
+
+    rss_before = peak_rss_mb()
+    start = time.perf_counter()
+    chunks = 0
+    for _ in main.iter_split_text(main.iter_txt_chunks(path)):
+        chunks += 1
+    elapsed = time.perf_counter() - start
+    size_mb = os.path.getsize(path) / (1024 * 1024)
+    os.remove(path)
+
+    return {
+        "case": "txt",
+        "file_mb": round(size_mb, 1),
+        "chunks": chunks,
+        "seconds": round(elapsed, 3),
+        "mb_per_second": round(size_mb / elapsed, 1),
+        "rss_before_mb": round(rss_before, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def bench_docx(args):
+    """Compare DOCX extraction against the old paragraphs-only join"""
+    from docx import Document
+
+    workdir = tempfile.mkdtemp(prefix="bench-docx-")
+    path = os.path.join(workdir, "course.docx")
+    doc = Document()
+    for section in range(args.sections):
+        doc.add_heading(f"Chapter {section}", level=1)
+        doc.add_paragraph("Photosynthesis converts light energy into chemical energy. " * 5)
+        doc.add_paragraph("Light-dependent reactions", style="List Bullet")
+        doc.add_paragraph("Calvin cycle", style="List Bullet")
+        table = doc.add_table(rows=4, cols=3)
+        for row in table.rows:
+            for i, cell in enumerate(row.cells):
+                cell.text = f"value {section}-{i}"
+    doc.save(path)
+
+    sys.path.insert(0, REPO_DIR)
+    os.chdir(workdir)
+    import main
+
+    start = time.perf_counter()
+    legacy = "\n".join(p.text for p in Document(path).paragraphs)
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    blocks = main.extract_docx_blocks(path)
+    text = main.render_blocks(blocks)
+    seconds = time.perf_counter() - start
+    size_mb = os.path.getsize(path) / (1024 * 1024)
+
+    return {
+        "case": "docx",
+        "file_mb": round(size_mb, 2),
+        "blocks": len(blocks),
+        "legacy_seconds": round(legacy_seconds, 3),
+        "legacy_chars": len(legacy),
+        "seconds": round(seconds, 3),
+        "chars": len(text),
+        "mb_per_second": round(size_mb / seconds, 2),
+    }
+
+
+def bench_chunk(args):
+    """Token-aware chunking throughput against the character splitter"""
+    rng = random.Random(0)
+    words = [
+        "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(2, 12)))
+        for _ in range(20_000)
+    ]
+    sections = []
+    size = 0
+    while size < args.mb * 1024 * 1024:
+        paragraphs = [
+            ". ".join(" ".join(rng.choices(words, k=rng.randint(6, 24))) for _ in range(rng.randint(2, 8))) + "."
+            for _ in range(rng.randint(1, 6))
+        ]
+        section = f"## Section {len(sections)}\n\n" + "\n\n".join(paragraphs)
+        if len(sections) % 10 == 9:
+            section += "\f"
+        sections.append(section)
+        size += len(section)
+    text = "\n\n".join(sections)
+    size_mb = len(text.encode()) / (1024 * 1024)
+
+    workdir = tempfile.mkdtemp(prefix="bench-chunk-")
+    sys.path.insert(0, REPO_DIR)
+    os.chdir(workdir)
+    import main
+
+    start = time.perf_counter()
+    legacy = sum(1 for _ in main.iter_split_text(text))
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    chunks = list(main.iter_token_chunks(text, args.tokens))
+    seconds = time.perf_counter() - start
+    sizes = [main.count_tokens(chunk) for chunk in chunks]
+
+    # Second pass over the same text is served from the token cache
+    start = time.perf_counter()
+    sum(1 for _ in main.iter_token_chunks(text, args.tokens))
+    warm_seconds = time.perf_counter() - start
+
+    return {
+        "case": "chunk",
+        "text_mb": round(size_mb, 1),
+        "legacy_chunks": legacy,
+        "legacy_mb_per_second": round(size_mb / legacy_seconds, 1),
+        "chunks": len(chunks),
+        "max_chunk_tokens": max(sizes),
+        "mean_chunk_tokens": round(sum(sizes) / len(sizes), 1),
+        "mb_per_second": round(size_mb / seconds, 1),
+        "warm_mb_per_second": round(size_mb / warm_seconds, 1),
+        "token_cache": main._count_chunk_tokens.cache_info()._asdict(),
+    }
+
+
+def seed_database(path: str, scale: int):
+    """Fill a fresh database with scale flashcards and matching documents"""
+    documents = max(1, scale // 20)
+    concepts_per_document = 5
+    cards_per_concept = max(1, scale // (documents * concepts_per_document))
+    now = datetime.now().isoformat()
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    doc_ids = [str(uuid.uuid4()) for _ in range(documents)]
+    conn.executemany(
+        "INSERT INTO documents (id, name, type, file_path, upload_date, processed) "
+        "VALUES (?, ?, 'txt', ?, ?, TRUE)",
+        ((doc_id, f"doc-{i}.txt", f"uploads/{doc_id}.txt", now) for i, doc_id in enumerate(doc_ids)),
+    )
+
+    concepts = []
+    for doc_id in doc_ids:
+        for i in range(concepts_per_document):
+            concepts.append((str(uuid.uuid4()), doc_id, f"Concept {i}", "Explanation " * 10, ["high", "medium", "low"][i % 3]))
+    conn.executemany(
+        "INSERT INTO concepts (id, document_id, title, explanation, importance) VALUES (?, ?, ?, ?, ?)",
+        concepts,
+    )
+
+    def cards():
+        for concept_id, doc_id, *_ in concepts:
+            for i in range(cards_per_concept):
+                yield (str(uuid.uuid4()), concept_id, doc_id, f"Question {i}?", "Answer " * 8, random.uniform(0.5, 2.5))
+
+    conn.executemany(
+        "INSERT INTO flashcards (id, concept_id, document_id, question, answer, difficulty) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        cards(),
+    )
+    conn.commit()
+    card_ids = [row[0] for row in conn.execute("SELECT id FROM flashcards ORDER BY random() LIMIT 5000")]
+    conn.close()
+    return doc_ids, card_ids
+
+
+def wait_for(host: str, port: int, path: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=2)
+            conn.request("GET", path)
+            if conn.getresponse().status < 500:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{host}:{port}{path} did not come up")
+
+
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class LoadClient:
+    """One keep-alive connection issuing the weighted request mix"""
+
+    def __init__(self, port: int, token: str, doc_ids, card_ids, uploaded):
+        self.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+        self.auth = {"Authorization": f"Bearer {token}"}
+        self.doc_ids = doc_ids
+        self.card_ids = card_ids
+        self.uploaded = uploaded
+
+    def request(self, method: str, path: str, body=None, headers=None) -> int:
+        self.conn.request(method, path, body=body, headers=headers or {})
+        response = self.conn.getresponse()
+        payload = response.read()
+        if method == "POST" and path == "/upload/" and response.status == 200:
+            self.uploaded.append(json.loads(payload)["id"])
+        return response.status
+
+    def upload(self):
+        boundary = uuid.uuid4().hex
+        text = "Photosynthesis converts light energy into chemical energy. " * 50
+        body = (
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"notes.txt\"\r\n"
+            f"Content-Type: text/plain\r\n\r\n{text}\r\n--{boundary}--\r\n"
+        ).encode()
+        return self.request("POST", "/upload/", body, {"Content-Type": f"multipart/form-data; boundary={boundary}"})
+
+    def process(self):
+        doc_id = self.uploaded.pop() if self.uploaded else random.choice(self.doc_ids)
+        return self.request("POST", f"/documents/{doc_id}/process")
+
+    def review(self):
+        body = json.dumps({"correct": random.random() < 0.7})
+        return self.request(
+            "POST", f"/flashcards/{random.choice(self.card_ids)}/review", body, {"Content-Type": "application/json"}
+        )
+
+    def for_review(self):
+        return self.request("GET", "/flashcards/for-review?limit=20")
+
+    def flashcards(self):
+        return self.request("GET", f"/documents/{random.choice(self.doc_ids)}/flashcards")
+
+    def progress(self):
+        return self.request("GET", "/users/me/progress", headers=self.auth)
+
+    def export(self):
+        return self.request("GET", f"/documents/{random.choice(self.doc_ids)}/export/flashcards", headers=self.auth)
+
+
+# Route name -> relative weight in the request mix
+LOAD_MIX = {
+    "upload": 3,
+    "process": 3,
+    "review": 40,
+    "for_review": 20,
+    "flashcards": 20,
+    "progress": 8,
+    "export": 6,
+}
+
+
+def bench_load(args):
+    """Drive a realistic request mix against the API backed by a fake LLM"""
+    workdir = tempfile.mkdtemp(prefix="bench-load-")
+    sys.path.insert(0, REPO_DIR)
+    os.chdir(workdir)
+    import main  # creates the schema in workdir
+
+    start = time.perf_counter()
+    doc_ids, card_ids = seed_database(main.DATABASE_NAME, args.scale)
+    seed_seconds = time.perf_counter() - start
+
+    fake = subprocess.Popen(
+        [sys.executable, os.path.join(REPO_DIR, "fake_gemini.py"), "--port", str(args.llm_port),
+         "--latency", str(args.llm_latency), "--words", str(args.llm_words)],
+        stdout=subprocess.DEVNULL,
+    )
+    env = dict(os.environ, GEMINI_API_ENDPOINT=f"http://127.0.0.1:{args.llm_port}")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", REPO_DIR,
+         "--port", str(args.port), "--workers", str(args.workers), "--log-level", "warning"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        wait_for("127.0.0.1", args.port, "/health")
+        form = urllib.parse.urlencode({"username": "testuser", "password": "testpassword"})
+        conn = http.client.HTTPConnection("127.0.0.1", args.port)
+        conn.request("POST", "/token", form, {"Content-Type": "application/x-www-form-urlencoded"})
+        token = json.loads(conn.getresponse().read())["access_token"]
+
+        routes, weights = zip(*LOAD_MIX.items())
+        latencies = {route: [] for route in routes}
+        errors = {route: 0 for route in routes}
+        lock = threading.Lock()
+        uploaded = []
+        stop_at = time.monotonic() + args.duration
+
+        def worker():
+            client = LoadClient(args.port, token, doc_ids, card_ids, uploaded)
+            rng = random.Random()
+            while time.monotonic() < stop_at:
+                route = rng.choices(routes, weights)[0]
+                began = time.perf_counter()
+                try:
+                    ok = getattr(client, route)() < 500
+                except (OSError, http.client.HTTPException):
+                    client.conn.close()
+                    ok = False
+                elapsed = time.perf_counter() - began
+                with lock:
+                    latencies[route].append(elapsed)
+                    if not ok:
+                        errors[route] += 1
+
+        threads = [threading.Thread(target=worker) for _ in range(args.concurrency)]
+        began = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - began
+    finally:
+        server.terminate()
+        fake.terminate()
+        server.wait()
+        fake.wait()
+
+    commit = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True
+    ).stdout.strip() or "unknown"
+    result = {
+        "case": "load",
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(),
+        "scale": args.scale,
+        "concurrency": args.concurrency,
+        "workers": args.workers,
+        "duration_seconds": round(wall, 1),
+        "seed_seconds": round(seed_seconds, 1),
+        "llm_latency": args.llm_latency,
+        "total_rps": round(sum(len(v) for v in latencies.values()) / wall, 1),
+        "routes": {
+            route: {
+                "requests": len(samples),
+                "errors": errors[route],
+                "rps": round(len(samples) / wall, 1),
+                "p50_ms": round(percentile(samples, 0.50) * 1000, 1),
+                "p99_ms": round(percentile(samples, 0.99) * 1000, 1),
+            }
+            for route, samples in latencies.items()
+            if samples
+        },
+    }
+
+    output = args.output or os.path.join(REPO_DIR, "benchmarks", "results", f"{commit}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(result, file, indent=2)
+    result["output"] = output
+    return result
+
+
+def seed_shards(users: int, cards: int):
+    """Spread cards over the shards of the main module imported in this process"""
+    import main
+
+    now = datetime.now().isoformat()
+    per_document = 20
+    documents, flashcards, routes = defaultdict(list), defaultdict(list), []
+    for i in range(max(1, cards // per_document)):
+        doc_id = str(uuid.uuid4())
+        shard = main.shard_for(f"user-{i % users}", doc_id)
+        documents[shard].append((doc_id, f"doc-{i}.txt", f"uploads/{doc_id}.txt", now, f"user-{i % users}"))
+        routes.append((doc_id, doc_id, shard))
+        for j in range(per_document):
+            card_id = str(uuid.uuid4())
+            flashcards[shard].append((card_id, doc_id, f"Question {j}?", "Answer " * 8))
+            routes.append((card_id, doc_id, shard))
+
+    for shard, rows in documents.items():
+        conn = sqlite3.connect(shard)
+        conn.executemany(
+            "INSERT INTO documents (id, name, type, file_path, upload_date, processed, user_id) "
+            "VALUES (?, ?, 'txt', ?, ?, TRUE, ?)",
+            rows,
+        )
+        conn.executemany(
+            "INSERT INTO flashcards (id, document_id, question, answer) VALUES (?, ?, ?, ?)",
+            flashcards[shard],
+        )
+        conn.commit()
+        conn.close()
+    conn = sqlite3.connect(main.DATABASE_NAME)
+    conn.executemany("INSERT INTO shard_routes (entity_id, document_id, shard) VALUES (?, ?, ?)", routes)
+    conn.commit()
+    conn.close()
+    return [route[0] for route in routes if route[0] != route[1]]
+
+
+def slow_commits(latency: float):
+    """Hold the write lock for latency seconds at every commit in this process.
+
+    Local disks with a write-back cache sync in microseconds, which hides
+    the lock contention that separate shard files avoid.
+    """
+    connect = sqlite3.connect
+
+    def trace(statement):
+        if statement == "COMMIT":
+            time.sleep(latency)
+
+    def slow_connect(*args, **kwargs):
+        conn = connect(*args, **kwargs)
+        conn.set_trace_callback(trace)
+        return conn
+
+    sqlite3.connect = slow_connect
+
+
+def review_writer(card_ids, duration: float, latency: float, results):
+    """Record reviews through the API handler until the deadline"""
+    if latency:
+        slow_commits(latency)
+    import main
+
+    rng = random.Random()
+    done = 0
+    stop_at = time.monotonic() + duration
+    while time.monotonic() < stop_at:
+        review = main.FlashcardReview(correct=rng.random() < 0.7)
+        main.record_flashcard_review(rng.choice(card_ids), review)
+        done += 1
+    results.put(done)
+
+
+def bench_shards(args):
+    """Review write throughput from several processes as the shard count grows"""
+    context = multiprocessing.get_context("spawn")
+    sys.path.insert(0, REPO_DIR)
+    runs = []
+    for count in args.counts:
+        # Spawned processes inherit the working directory and environment
+        os.chdir(tempfile.mkdtemp(prefix=f"bench-shards-{count}-"))
+        os.environ.update(SHARD_MODE="hash", SHARD_COUNT=str(count))
+        with context.Pool(1) as pool:
+            card_ids = pool.apply(seed_shards, (args.users, args.cards))
+
+        results = context.Queue()
+        writers = [
+            context.Process(
+                target=review_writer,
+                args=(card_ids, args.duration, args.commit_latency_ms / 1000, results),
+            )
+            for _ in range(args.processes)
+        ]
+        for writer in writers:
+            writer.start()
+        reviews = sum(results.get() for _ in writers)
+        for writer in writers:
+            writer.join()
+        runs.append(
+            {
+                "shards": count,
+                "reviews": reviews,
+                "reviews_per_second": round(reviews / args.duration, 1),
+                # Throughput relative to the first shard count
+                "speedup": round(reviews / runs[0]["reviews"], 2) if runs else 1.0,
+            }
+        )
+
+    return {
+        "case": "shards",
+        "processes": args.processes,
+        "users": args.users,
+        "cards": args.cards,
+        "commit_latency_ms": args.commit_latency_ms,
+        "runs": runs,
+    }
+
+
+def bench_graph(args):
+    """Build the related concepts graph at scale, then time incremental updates"""
+    workdir = tempfile.mkdtemp(prefix="bench-graph-")
+    sys.path.insert(0, REPO_DIR)
+    os.chdir(workdir)
+    import main
+
+    rng = random.Random(0)
+    vocabulary = [
+        "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 10)))
+        for _ in range(30_000)
+    ]
+    topics = [rng.sample(vocabulary, 300) for _ in range(max(1, args.concepts // 200))]
+
+    def make_concepts(document_id):
+        topic = rng.choice(topics)
+        return [
+            (
+                str(uuid.uuid4()),
+                document_id,
+                " ".join(rng.choices(topic, k=3)),
+                " ".join(rng.choices(topic, k=20) + rng.choices(vocabulary, k=10)),
+                "medium",
+            )
+            for _ in range(5)
+        ]
+
+    def insert_document(conn, document_id, concepts):
+        conn.execute(
+            "INSERT INTO documents (id, name, type, file_path, upload_date, processed, user_id) "
+            "VALUES (?, 'doc.txt', 'txt', 'doc.txt', ?, TRUE, 'bench')",
+            (document_id, datetime.now().isoformat()),
+        )
+        conn.executemany(
+            "INSERT INTO concepts (id, document_id, title, explanation, importance) VALUES (?, ?, ?, ?, ?)",
+            concepts,
+        )
+
+    conn = sqlite3.connect(main.DATABASE_NAME)
+    start = time.perf_counter()
+    vectors = []
+    for _ in range(args.concepts // 5):
+        document_id = str(uuid.uuid4())
+        concepts = make_concepts(document_id)
+        insert_document(conn, document_id, concepts)
+        for concept_id, _, title, explanation, _ in concepts:
+            terms, weights = main.concept_terms(title, explanation)
+            vectors.append((concept_id, document_id, "bench", terms.tobytes(), weights.tobytes()))
+    conn.executemany(
+        "INSERT INTO concept_vectors (concept_id, document_id, user_id, terms, weights) VALUES (?, ?, ?, ?, ?)",
+        vectors,
+    )
+    conn.commit()
+    seed_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    library = main.load_concept_library(conn, "bench")
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    main.rescore_concept_library(conn, "bench", library, force=True)
+    build_seconds = time.perf_counter() - start
+    del library
+
+    added, add_seconds, changed = [], [], []
+    for _ in range(args.updates):
+        document_id = str(uuid.uuid4())
+        insert_document(conn, document_id, make_concepts(document_id))
+        conn.commit()
+        start = time.perf_counter()
+        changed.append(len(main.add_document_to_graph(conn, document_id)))
+        add_seconds.append(time.perf_counter() - start)
+        added.append(document_id)
+
+    remove_seconds = []
+    for document_id in added:
+        conn.execute("DELETE FROM concepts WHERE document_id = ?", (document_id,))
+        conn.commit()
+        start = time.perf_counter()
+        main.remove_document_from_graph(conn, document_id)
+        remove_seconds.append(time.perf_counter() - start)
+    conn.close()
+
+    return {
+        "case": "graph",
+        "concepts": args.concepts,
+        "seed_seconds": round(seed_seconds, 1),
+        "library_load_seconds": round(load_seconds, 3),
+        "build_seconds": round(build_seconds, 1),
+        "build_concepts_per_second": round(args.concepts / build_seconds, 1),
+        "add_p50_ms": round(percentile(add_seconds, 0.5) * 1000, 1),
+        "add_max_ms": round(max(add_seconds) * 1000, 1),
+        "add_documents_changed": round(sum(changed) / len(changed), 1),
+        "remove_p50_ms": round(percentile(remove_seconds, 0.5) * 1000, 1),
+        "remove_max_ms": round(max(remove_seconds) * 1000, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def bench_ratelimit(args):
+    """Per-request overhead of the rate limit middleware on a no-op app"""
+    import asyncio
+
+    workdir = tempfile.mkdtemp(prefix="bench-ratelimit-")
+    sys.path.insert(0, REPO_DIR)
+    os.chdir(workdir)
+    import main
+
+    scopes = []
+    for i in range(args.callers):
+        token = main.create_access_token({"sub": f"user-{i}"})
+        scopes.append(
+            {
+                "type": "http",
+                "method": "GET",
+                "path": f"/documents/{uuid.uuid4()}/quiz",
+                "headers": [(b"authorization", f"Bearer {token}".encode())],
+                "client": ("10.0.0.1", 4000),
+            }
+        )
+
+    async def noop(scope, receive, send):
+        pass
+
+    async def drive(app, requests: int) -> float:
+        start = time.perf_counter()
+        for i in range(requests):
+            await app(scopes[i % len(scopes)], None, None)
+        return (time.perf_counter() - start) / requests
+
+    # Generous limits so every request takes the allowed path
+    main.rate_limits = main.RateLimits(
+        "1000000000/1", "GET /documents/{document_id}/quiz=1000000000/1"
+    )
+    result = {"case": "ratelimit", "requests": args.requests, "callers": args.callers}
+    result["baseline_us"] = round(asyncio.run(drive(noop, args.requests)) * 1e6, 2)
+    middleware = main.RateLimitMiddleware(noop)
+    main.rate_backend = main.MemoryRateBackend()
+    result["memory_us"] = round(asyncio.run(drive(middleware, args.requests)) * 1e6, 2)
+    # Every shared-backend request is a write transaction, so run fewer
+    main.rate_backend = main.SQLiteRateBackend()
+    result["sqlite_us"] = round(asyncio.run(drive(middleware, args.requests // 10)) * 1e6, 2)
+    return result
+
+
+def bench_delete(args):
+    """DELETE latency and background purge time for growing decks"""
+    workdir = tempfile.mkdtemp(prefix="bench-delete-")
+    sys.path.insert(0, REPO_DIR)
+    os.chdir(workdir)
+    os.environ["GC_INTERVAL_SECONDS"] = "0"
+    import main
+
+    # Purge explicitly below so the request time is measured on its own
+    scheduled = []
+    main.garbage_collector.schedule_purge = lambda *item: scheduled.append(item)
+
+    def insert_deck(conn, document_id, cards):
+        conn.execute(
+            "INSERT INTO documents (id, name, type, file_path, upload_date) "
+            "VALUES (?, 'deck.txt', 'txt', ?, ?)",
+            (document_id, f"{document_id}.txt", datetime.now().isoformat()),
+        )
+        conn.executemany(
+            "INSERT INTO flashcards (id, document_id, question, answer) VALUES (?, ?, ?, ?)",
+            ((str(uuid.uuid4()), document_id, "question " * 8, "answer " * 30) for _ in range(cards)),
+        )
+        conn.commit()
+
+    result = {"case": "delete", "decks": {}}
+    for cards in args.cards:
+        document_id = str(uuid.uuid4())
+        main.db.call(insert_deck, document_id, cards)
+        start = time.perf_counter()
+        main.delete_document(document_id)
+        delete_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        main.purge_document(*scheduled.pop())
+        result["decks"][cards] = {
+            "delete_ms": round(delete_ms, 2),
+            "purge_ms": round((time.perf_counter() - start) * 1000, 1),
+        }
+    return result
+
+
+def bench_upload(args):
+    """Single-request vs resumable upload throughput and bytes resent after a drop"""
+    from fastapi.testclient import TestClient
+
+    workdir = tempfile.mkdtemp(prefix="bench-upload-")
+    sys.path.insert(0, REPO_DIR)
+    os.chdir(workdir)
+    import main
+
+    client = TestClient(main.app)
+    data = os.urandom(args.mb * 1024 * 1024)
+    chunk = args.chunk_mb * 1024 * 1024
+
+    start = time.perf_counter()
+    client.post("/upload/", files={"file": ("bench.txt", data, "text/plain")})
+    single_s = time.perf_counter() - start
+
+    def resumable(fail_at: float | None) -> int:
+        """Upload in chunks, losing the connection once; returns bytes sent"""
+        upload_id = client.post("/uploads/", json={"name": "bench.txt", "size": len(data)}).json()["id"]
+        offset = sent = 0
+        while offset < len(data):
+            body = data[offset : offset + chunk]
+            if fail_at is not None and offset + len(body) > fail_at * len(data):
+                # The chunk in flight is lost; ask the server where to resume
+                sent += len(body) // 2
+                fail_at = None
+                offset = int(client.head(f"/uploads/{upload_id}").headers["upload-offset"])
+                continue
+            client.patch(f"/uploads/{upload_id}", content=body, headers={"Upload-Offset": str(offset)})
+            sent += len(body)
+            offset += len(body)
+        return sent
+
+    start = time.perf_counter()
+    resumable(None)
+    resumable_s = time.perf_counter() - start
+    size_mb = len(data) / 1024 / 1024
+    return {
+        "case": "upload",
+        "mb": args.mb,
+        "chunk_mb": args.chunk_mb,
+        "single_mb_s": round(size_mb / single_s, 1),
+        "resumable_mb_s": round(size_mb / resumable_s, 1),
+        # A single-request upload dropped at 90% starts over from byte zero
+        "single_sent_after_drop_mb": round(size_mb * 1.9, 1),
+        "resumable_sent_after_drop_mb": round(resumable(0.9) / 1024 / 1024, 1),
+    }
+
+
+def bench_folder(args):
+    """Studying a folder: one request per document vs the folder-level endpoints"""
+    from fastapi.testclient import TestClient
+
+    workdir = tempfile.mkdtemp(prefix="bench-folder-")
+    sys.path.insert(0, REPO_DIR)
+    os.chdir(workdir)
+    import main
+
+    client = TestClient(main.app)
+    token = client.post("/token", data={"username": "testuser", "password": "testpassword"})
+    headers = {"Authorization": f"Bearer {token.json()['access_token']}"}
+    folder_id = client.post("/folders/?name=bench", headers=headers).json()["id"]
+
+    document_ids = [str(uuid.uuid4()) for _ in range(args.documents)]
+    conn = sqlite3.connect(main.DATABASE_NAME)
+    conn.executemany(
+        "INSERT INTO documents (id, name, type, file_path, upload_date, processed) "
+        "VALUES (?, 'doc.txt', 'txt', 'doc.txt', ?, TRUE)",
+        [(document_id, datetime.now().isoformat()) for document_id in document_ids],
+    )
+    conn.executemany(
+        "INSERT INTO flashcards (id, document_id, question, answer, difficulty) VALUES (?, ?, ?, ?, ?)",
+        [
+            (str(uuid.uuid4()), document_id, "question " * 8, "answer " * 30, random.random() * 3)
+            for document_id in document_ids
+            for _ in range(args.cards)
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+    def timed(fn) -> float:
+        start = time.perf_counter()
+        fn()
+        return round((time.perf_counter() - start) * 1000, 1)
+
+    result = {"case": "folder", "documents": args.documents, "cards_per_document": args.cards}
+    result["add_one_by_one_ms"] = timed(
+        lambda: [
+            client.post(f"/documents/{document_id}/add-to-folder/{folder_id}", headers=headers)
+            for document_id in document_ids
+        ]
+    )
+    client.post(f"/folders/{folder_id}/documents/remove", headers=headers, json={"document_ids": document_ids})
+    result["add_batch_ms"] = timed(
+        lambda: client.post(
+            f"/folders/{folder_id}/documents", headers=headers, json={"document_ids": document_ids}
+        )
+    )
+    # The client-side way to build a review queue: fetch every deck, then sort
+    result["review_per_document_ms"] = timed(
+        lambda: sorted(
+            (
+                card
+                for document_id in document_ids
+                for card in client.get(f"/documents/{document_id}/flashcards").json()
+            ),
+            key=lambda card: -card["difficulty"],
+        )[:20]
+    )
+    result["review_folder_ms"] = timed(
+        lambda: client.get(f"/folders/{folder_id}/review?limit=20", headers=headers).json()
+    )
+    result["export_folder_ms"] = timed(
+        lambda: client.get(f"/folders/{folder_id}/export/flashcards", headers=headers).text
+    )
+    return result
+
+
+def bench_analytics(args):
+    """Review analytics over millions of events stored as column blocks"""
+    workdir = tempfile.mkdtemp(prefix="bench-analytics-")
+    sys.path.insert(0, REPO_DIR)
+    os.chdir(workdir)
+    import numpy as np
+
+    import main
+
+    # Half of the events are another user's, in blocks of their own
+    rng = np.random.default_rng(0)
+    shuffled = rng.permutation(np.arange(1, 2 * args.cards + 1))
+    numbers, other_numbers = shuffled[: args.cards], shuffled[args.cards :]
+    now = time.time()
+
+    start = time.perf_counter()
+    conn = sqlite3.connect(main.DATABASE_NAME)
+    block = main.REVIEW_BLOCK_EVENTS
+    for number, offset in enumerate(range(0, args.events, block)):
+        size = min(block, args.events - offset)
+        user_id, cards = ("bench", numbers) if number % 2 == 0 else ("other", other_numbers)
+        main.insert_review_block(
+            conn,
+            user_id,
+            rng.choice(cards, size),
+            now - rng.exponential(30 * 86400, size),
+            rng.random(size) < 0.8,
+        )
+    conn.commit()
+    write_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    events = main.load_review_events(conn, "bench")
+    load_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    card, times, correct = main.user_card_events(numbers, events)
+    report = main.review_analytics(
+        rng.integers(0, args.cards // 50 + 1, args.cards),
+        rng.integers(-1, args.cards // 5, args.cards),
+        card,
+        times,
+        correct,
+        now,
+        now - now % 86400,
+        30,
+    )
+    compute_s = time.perf_counter() - start
+    conn.close()
+    return {
+        "case": "analytics",
+        "events": report["events"],
+        "all_users_events": args.events,
+        "cards": args.cards,
+        "db_mb": round(os.path.getsize(main.DATABASE_NAME) / 1024 / 1024, 1),
+        "write_s": round(write_s, 2),
+        "load_s": round(load_s, 3),
+        "compute_s": round(compute_s, 3),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def bench_dedup(args):
+    """Near-duplicate checks for new documents against a growing card library"""
+    workdir = tempfile.mkdtemp(prefix="bench-dedup-")
+    sys.path.insert(0, REPO_DIR)
+    os.chdir(workdir)
+    import numpy as np
+
+    import main
+
+    rng = random.Random(0)
+    vocabulary = [f"term{i}" for i in range(5000)]
+
+    def sentence(words: int) -> str:
+        return " ".join(rng.choices(vocabulary, k=words))
+
+    def reword(text: str) -> str:
+        words = text.split()
+        for _ in range(max(1, len(words) // 20)):
+            words[rng.randrange(len(words))] = rng.choice(vocabulary)
+        return " ".join(words)
+
+    conn = sqlite3.connect(main.DATABASE_NAME)
+
+    def add_document(cards: list) -> tuple:
+        document_id = str(uuid.uuid4())
+        conn.execute(
+            "INSERT INTO documents (id, name, type, file_path, upload_date, processed, user_id) "
+            "VALUES (?, 'doc.txt', 'txt', 'doc.txt', ?, TRUE, 'bench')",
+            (document_id, datetime.now().isoformat()),
+        )
+        conn.executemany(
+            "INSERT INTO flashcards (id, document_id, question, answer) VALUES (?, ?, ?, ?)",
+            [(str(uuid.uuid4()), document_id, question, answer) for question, answer in cards],
+        )
+        start = time.perf_counter()
+        found = main.find_near_duplicates(conn, document_id, "flag")
+        conn.commit()
+        return found, time.perf_counter() - start
+
+    library = []
+    start = time.perf_counter()
+    for _ in range(args.cards // args.per_document):
+        cards = [(sentence(12) + "?", sentence(30)) for _ in range(args.per_document)]
+        library.extend(cards)
+        add_document(cards)
+    index_s = time.perf_counter() - start
+
+    # New documents: half reworded cards from the library, half new ones
+    found, seconds = 0, []
+    for _ in range(args.documents):
+        cards = [
+            (reword(question), reword(answer))
+            for question, answer in rng.sample(library, args.per_document // 2)
+        ] + [(sentence(12) + "?", sentence(30)) for _ in range(args.per_document // 2)]
+        duplicates, elapsed = add_document(cards)
+        found += duplicates
+        seconds.append(elapsed)
+
+    # What a pairwise check of one new card against every stored signature costs
+    signatures = np.frombuffer(
+        b"".join(row[0] for row in conn.execute("SELECT signature FROM near_duplicate_signatures")),
+        dtype=np.uint32,
+    ).reshape(-1, main.DEDUP_BANDS * main.DEDUP_ROWS)
+    probe = main.minhash(" ".join(library[0]))
+    start = time.perf_counter()
+    for _ in range(args.per_document):
+        (signatures == probe).mean(axis=1).argmax()
+    pairwise_s = time.perf_counter() - start
+    conn.close()
+    return {
+        "case": "dedup",
+        "library_cards": len(library),
+        "cards_per_document": args.per_document,
+        "index_s": round(index_s, 2),
+        "check_document_ms": round(1000 * sum(seconds) / len(seconds), 1),
+        "pairwise_signature_scan_ms": round(1000 * pairwise_s, 1),
+        "planted_duplicates": args.documents * (args.per_document // 2),
+        "duplicates_found": found,
+        "db_mb": round(os.path.getsize(main.DATABASE_NAME) / 1024 / 1024, 1),
+    }
+
+
+def bench_llm_scheduler(args):
+    """Interactive LLM latency during a batch ingest spike, with and without priorities"""
+    workdir = tempfile.mkdtemp(prefix="bench-llm-scheduler-")
+    sys.path.insert(0, REPO_DIR)
+    os.chdir(workdir)
+    import main
+
+    def run(prioritized: bool) -> dict:
+        scheduler = main.LLMScheduler(
+            main.LLM_SCHEDULER_SLOTS,
+            main.LLM_INTERACTIVE_RESERVED_SLOTS if prioritized else 0,
+            {"interactive": 10**6, "batch": 10**6},
+            {"interactive": 3600, "batch": 3600},
+            "",
+        )
+        main.llm.scheduler = scheduler
+        # Stand-in for Gemini: only the queueing in front of it is measured
+        main.llm._generate = lambda prompt, timeout, principal, profile: time.sleep(args.latency)
+        latencies = defaultdict(list)
+
+        def call(priority: str, principal: str, kind: str):
+            # Without priorities every call queues first come, first served
+            main.llm_priority.set(priority if prioritized else "interactive")
+            main.current_principal.set(principal if prioritized else "shared")
+            start = time.perf_counter()
+            main.llm.generate("prompt " * 200)
+            latencies[kind].append(time.perf_counter() - start)
+
+        threads = [
+            # One user processing a big folder, another a single document
+            threading.Thread(target=call, args=("batch", "user:bulk", "batch_bulk"))
+            for _ in range(args.batch)
+        ] + [
+            threading.Thread(target=call, args=("batch", "user:light", "batch_light"))
+            for _ in range(args.batch // 20)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(args.latency)
+        quizzes = []
+        for i in range(args.interactive):
+            quizzes.append(
+                threading.Thread(target=call, args=("interactive", f"user:{i}", "interactive"))
+            )
+            quizzes[-1].start()
+            time.sleep(args.latency / 2)
+        for thread in threads + quizzes:
+            thread.join()
+
+        def percentile(values: list, q: float) -> float:
+            values = sorted(values)
+            return round(values[min(len(values) - 1, int(len(values) * q))], 2)
+
+        return {
+            kind: {"p50_s": percentile(values, 0.5), "p95_s": percentile(values, 0.95)}
+            for kind, values in sorted(latencies.items())
+        }
+
+    return {
+        "case": "llm_scheduler",
+        "slots": main.LLM_SCHEDULER_SLOTS,
+        "batch_calls": args.batch,
+        "interactive_calls": args.interactive,
+        "fifo": run(False),
+        "scheduled": run(True),
+    }
+
+
+def bench_db_executor(args):
+    """Concurrent reads and writes through DatabaseExecutor; exits 1 if a check fails"""
+    import asyncio
+
+    workdir = tempfile.mkdtemp(prefix="bench-db-executor-")
+    sys.path.insert(0, REPO_DIR)
+    os.chdir(workdir)
+    import main
+    from fastapi import HTTPException
+
+    def setup(conn):
+        conn.execute("CREATE TABLE bench_counters (id INTEGER PRIMARY KEY, hits INTEGER)")
+        conn.executemany("INSERT INTO bench_counters VALUES (?, 0)", ((i,) for i in range(100)))
+        conn.commit()
+
+    def write(conn, counter: int):
+        conn.execute("UPDATE bench_counters SET hits = hits + 1 WHERE id = ?", (counter,))
+        conn.commit()
+
+    def read(conn, counter: int):
+        return conn.execute("SELECT hits FROM bench_counters WHERE id = ?", (counter,)).fetchone()
+
+    def slow(conn, rows: int):
+        return conn.execute(
+            "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < ?) "
+            "SELECT SUM(x) FROM c",
+            (rows,),
+        ).fetchone()
+
+    main.db.call(setup)
+    errors = defaultdict(int)
+    counts = defaultdict(int)
+    lags = []
+
+    async def client(op, deadline: float):
+        while time.monotonic() < deadline:
+            try:
+                await main.db.run(op, random.randrange(100))
+                counts[op.__name__] += 1
+            except HTTPException as e:
+                errors[f"http_{e.status_code}"] += 1
+                await asyncio.sleep(0.01)
+            except sqlite3.OperationalError as e:
+                errors[str(e)] += 1
+
+    async def ticker(deadline: float):
+        # Every other request waits on this loop, so its lag is theirs
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            await asyncio.sleep(0.005)
+            lags.append(time.perf_counter() - start - 0.005)
+
+    async def drive():
+        deadline = time.monotonic() + args.duration
+        start = time.perf_counter()
+        slow_task = asyncio.ensure_future(main.db.run(slow, args.slow_rows))
+        slow_task.add_done_callback(lambda _: counts.__setitem__("slow_s", time.perf_counter() - start))
+        await asyncio.gather(
+            ticker(deadline),
+            *(client(write, deadline) for _ in range(args.writers)),
+            *(client(read, deadline) for _ in range(args.readers)),
+        )
+        await slow_task
+
+    asyncio.run(drive())
+    total = main.db.call(lambda conn: conn.execute("SELECT SUM(hits) FROM bench_counters").fetchone()[0])
+
+    # Backpressure: one worker held on a gate, then queue until refused
+    executor = main.DatabaseExecutor(1, args.max_pending)
+    gate = threading.Event()
+    accepted, refused = [], None
+    while refused is None and len(accepted) <= args.max_pending:
+        try:
+            accepted.append(executor.submit(lambda conn: gate.wait(10)))
+        except HTTPException as e:
+            refused = e.status_code
+    gate.set()
+    drained = all(future.result(timeout=10) for future in accepted)
+    recovered = executor.call(lambda conn: conn.execute("SELECT 1").fetchone()[0]) == 1
+
+    lags.sort()
+    result = {
+        "case": "db_executor",
+        "workers": main.DB_WORKERS,
+        "writes": counts["write"],
+        "reads": counts["read"],
+        "slow_query_s": round(counts["slow_s"], 2),
+        "loop_lag_p99_ms": round(percentile(lags, 0.99) * 1000, 2),
+        "loop_lag_max_ms": round(lags[-1] * 1000, 2),
+        "errors": dict(errors),
+        "backpressure": {"accepted": len(accepted), "refused_status": refused},
+    }
+    checks = {
+        "no locked errors": not any("locked" in error for error in errors),
+        "no other errors": not errors,
+        "every write counted": total == counts["write"],
+        "slow query did not stall the loop": lags[-1] < counts["slow_s"] / 2,
+        "503 once max_pending are queued": refused == 503 and len(accepted) == args.max_pending,
+        "queued work drains and the executor recovers": drained and recovered,
+    }
+    result["failures"] = [name for name, ok in checks.items() if not ok]
+    return result
+
+
+def bench_backup(args):
+    """Review write latency while a large database is copied, backed up in one step, or snapshotted"""
+    import shutil
+
+    workdir = tempfile.mkdtemp(prefix="bench-backup-")
+    sys.path.insert(0, REPO_DIR)
+    os.chdir(workdir)
+    import main
+
+    # Grow the database with text-like rows, about 1 MiB per statement
+    conn = sqlite3.connect(main.DATABASE_NAME)
+    conn.execute("PRAGMA journal_mode=WAL")
+    start = time.perf_counter()
+    for _ in range(args.mb):
+        conn.execute(
+            """
+            INSERT INTO review_blocks (events, cards, times, correct)
+            WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 256)
+            SELECT 4096, hex(randomblob(1024)), zeroblob(1024), x'00' FROM n
+            """
+        )
+        conn.commit()
+    conn.close()
+    fill_s = time.perf_counter() - start
+
+    latencies = []
+    stop = threading.Event()
+
+    def writer():
+        # The write path of a flashcard review, at a steady rate
+        conn = sqlite3.connect(main.DATABASE_NAME, timeout=main.DB_BUSY_TIMEOUT)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        while not stop.is_set():
+            began = time.perf_counter()
+            conn.execute(
+                "INSERT INTO review_events (card, at, correct) VALUES (?, ?, ?)",
+                (random.randrange(1000), int(time.time()), 1),
+            )
+            conn.commit()
+            latencies.append(time.perf_counter() - began)
+            time.sleep(0.005)
+        conn.close()
+
+    def phase(action) -> dict:
+        latencies.clear()
+        stop.clear()
+        thread = threading.Thread(target=writer)
+        thread.start()
+        began = time.perf_counter()
+        action()
+        seconds = time.perf_counter() - began
+        stop.set()
+        thread.join()
+        values = sorted(latencies)
+        return {
+            "seconds": round(seconds, 2),
+            "writes": len(values),
+            "p50_ms": round(values[len(values) // 2] * 1000, 2),
+            "p99_ms": round(values[int(len(values) * 0.99)] * 1000, 2),
+            "max_ms": round(values[-1] * 1000, 2),
+        }
+
+    def one_step_backup():
+        source = sqlite3.connect(main.DATABASE_NAME)
+        target = sqlite3.connect("one-step.db")
+        source.backup(target)
+        target.close()
+        source.close()
+        os.remove("one-step.db")
+
+    result = {
+        "case": "backup",
+        "db_mb": round(os.path.getsize(main.DATABASE_NAME) / 1024 / 1024, 1),
+        "fill_s": round(fill_s, 1),
+        "idle": phase(lambda: time.sleep(2)),
+        "file_copy": phase(lambda: shutil.copyfile(main.DATABASE_NAME, "copy.db")),
+        "one_step_backup": phase(one_step_backup),
+    }
+    os.remove("copy.db")
+    snapshot = {}
+    result["paged_snapshot"] = phase(lambda: snapshot.update(main.create_snapshot()))
+    result["compressed_mb"] = round(snapshot["files"][0]["compressed_bytes"] / 1024 / 1024, 1)
+    return result
+
+
+def bench_responses(args):
+    """Serialization CPU of the response fast paths and bytes saved by compression"""
+    from fastapi.responses import JSONResponse
+    from pydantic import TypeAdapter
+
+    workdir = tempfile.mkdtemp(prefix="bench-responses-")
+    sys.path.insert(0, REPO_DIR)
+    os.chdir(workdir)
+    import main
+
+    words = "spaced repetition strengthens memory retrieval over time".split()
+    rows = [
+        (
+            str(uuid.uuid4()),
+            str(uuid.uuid4()),
+            str(uuid.uuid4()),
+            " ".join(random.choices(words, k=12)) + "?",
+            " ".join(random.choices(words, k=40)),
+            1.0,
+            datetime.now().isoformat() if i % 2 else None,
+            i % 7,
+            i % 3,
+        )
+        for i in range(args.cards)
+    ]
+    adapter = TypeAdapter(list[main.FlashcardModel])
+
+    def legacy() -> bytes:
+        # What FastAPI did per request: build models, validate them again
+        # against response_model, dump to JSON types, then json.dumps
+        models = [main.FlashcardModel(**main.flashcard_dict(row)) for row in rows]
+        content = adapter.dump_python(adapter.validate_python(models), mode="json")
+        return JSONResponse(content).body
+
+    def fast() -> bytes:
+        return main.DefaultResponse([main.flashcard_dict(row) for row in rows]).body
+
+    def timed(render) -> tuple:
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            body = render()
+        return round((time.perf_counter() - start) / args.rounds * 1000, 2), body
+
+    result = {"case": "responses", "cards": args.cards, "orjson": main.orjson is not None}
+    result["legacy_ms"], _ = timed(legacy)
+    result["fast_ms"], body = timed(fast)
+
+    content = " ".join(random.choices(words, k=args.content_kb * 150)).encode()
+    payloads = {"flashcards": body, "content": content}
+    codings = ["gzip"] + (["br"] if main.brotli is not None else [])
+    result["payloads"] = {}
+    for name, payload in payloads.items():
+        entry = {"identity_bytes": len(payload)}
+        for coding in codings:
+            start = time.perf_counter()
+            compressed = main.StreamCompressor(coding).chunk(payload, last=True)
+            entry[coding + "_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            entry[coding + "_bytes"] = len(compressed)
+        result["payloads"][name] = entry
+    return result
+
+
+def bench_compare(args):
+    """Diff two load results route by route"""
+    with open(args.old) as file:
+        old = json.load(file)
+    with open(args.new) as file:
+        new = json.load(file)
+
+    def change(before, after):
+        return round((after - before) / before * 100, 1) if before else None
+
+    return {
+        "case": "compare",
+        "old": old.get("commit"),
+        "new": new.get("commit"),
+        "total_rps_change_pct": change(old["total_rps"], new["total_rps"]),
+        "routes": {
+            route: {
+                metric + "_change_pct": change(old["routes"][route][metric], stats[metric])
+                for metric in ("rps", "p50_ms", "p99_ms")
+            }
+            for route, stats in new["routes"].items()
+            if route in old["routes"]
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    cases = parser.add_subparsers(dest="case", required=True)
+
+    csv_case = cases.add_parser("csv", help=bench_csv.__doc__)
+    csv_case.add_argument("--rows", type=int, default=1_000_000)
+    csv_case.set_defaults(run=bench_csv)
+
+    txt_case = cases.add_parser("txt", help=bench_txt.__doc__)
+    txt_case.add_argument("--mb", type=int, default=1024)
+    txt_case.set_defaults(run=bench_txt)
+
+    docx_case = cases.add_parser("docx", help=bench_docx.__doc__)
+    docx_case.add_argument("--sections", type=int, default=2000)
+    docx_case.set_defaults(run=bench_docx)
+
+    chunk_case = cases.add_parser("chunk", help=bench_chunk.__doc__)
+    chunk_case.add_argument("--mb", type=int, default=64)
+    chunk_case.add_argument("--tokens", type=int, default=512, help="chunk size in tokens")
+    chunk_case.set_defaults(run=bench_chunk)
+
+    load_case = cases.add_parser("load", help=bench_load.__doc__)
+    load_case.add_argument("--scale", type=int, default=10_000, help="number of seeded flashcards")
+    load_case.add_argument("--duration", type=float, default=30)
+    load_case.add_argument("--concurrency", type=int, default=16)
+    load_case.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    load_case.add_argument("--port", type=int, default=8765)
+    load_case.add_argument("--llm-port", type=int, default=8766)
+    load_case.add_argument("--llm-latency", type=float, default=0.3)
+    load_case.add_argument("--llm-words", type=int, default=20)
+    load_case.add_argument("--output", help="defaults to benchmarks/results/<commit>.json")
+    load_case.set_defaults(run=bench_load)
+
+    shards_case = cases.add_parser("shards", help=bench_shards.__doc__)
+    shards_case.add_argument("--counts", type=int, nargs="+", default=[1, 2, 4, 8])
+    shards_case.add_argument("--processes", type=int, default=8, help="concurrent writer processes")
+    shards_case.add_argument("--users", type=int, default=64)
+    shards_case.add_argument("--cards", type=int, default=20_000)
+    shards_case.add_argument("--duration", type=float, default=10)
+    shards_case.add_argument(
+        "--commit-latency-ms",
+        type=float,
+        default=2.0,
+        help="time each commit holds its write lock, as a syncing network disk would; 0 for none",
+    )
+    shards_case.set_defaults(run=bench_shards)
+
+    graph_case = cases.add_parser("graph", help=bench_graph.__doc__)
+    graph_case.add_argument("--concepts", type=int, default=100_000)
+    graph_case.add_argument("--updates", type=int, default=20, help="documents added then removed")
+    graph_case.set_defaults(run=bench_graph)
+
+    ratelimit_case = cases.add_parser("ratelimit", help=bench_ratelimit.__doc__)
+    ratelimit_case.add_argument("--requests", type=int, default=200_000)
+    ratelimit_case.add_argument("--callers", type=int, default=1000)
+    ratelimit_case.set_defaults(run=bench_ratelimit)
+
+    delete_case = cases.add_parser("delete", help=bench_delete.__doc__)
+    delete_case.add_argument("--cards", type=int, nargs="+", default=[100, 10_000, 200_000])
+    delete_case.set_defaults(run=bench_delete)
+
+    upload_case = cases.add_parser("upload", help=bench_upload.__doc__)
+    upload_case.add_argument("--mb", type=int, default=200)
+    upload_case.add_argument("--chunk-mb", type=int, default=8)
+    upload_case.set_defaults(run=bench_upload)
+
+    folder_case = cases.add_parser("folder", help=bench_folder.__doc__)
+    folder_case.add_argument("--documents", type=int, default=200)
+    folder_case.add_argument("--cards", type=int, default=50)
+    folder_case.set_defaults(run=bench_folder)
+
+    analytics_case = cases.add_parser("analytics", help=bench_analytics.__doc__)
+    analytics_case.add_argument("--events", type=int, default=10_000_000)
+    analytics_case.add_argument("--cards", type=int, default=100_000)
+    analytics_case.set_defaults(run=bench_analytics)
+
+    dedup_case = cases.add_parser("dedup", help=bench_dedup.__doc__)
+    dedup_case.add_argument("--cards", type=int, default=20_000)
+    dedup_case.add_argument("--per-document", type=int, default=20)
+    dedup_case.add_argument("--documents", type=int, default=50)
+    dedup_case.set_defaults(run=bench_dedup)
+
+    scheduler_case = cases.add_parser("llm-scheduler", help=bench_llm_scheduler.__doc__)
+    scheduler_case.add_argument("--batch", type=int, default=400)
+    scheduler_case.add_argument("--interactive", type=int, default=40)
+    scheduler_case.add_argument("--latency", type=float, default=0.2, help="seconds per LLM call")
+    scheduler_case.set_defaults(run=bench_llm_scheduler)
+
+    executor_case = cases.add_parser("db-executor", help=bench_db_executor.__doc__)
+    executor_case.add_argument("--duration", type=float, default=5)
+    executor_case.add_argument("--writers", type=int, default=16)
+    executor_case.add_argument("--readers", type=int, default=32)
+    executor_case.add_argument("--slow-rows", type=int, default=1_000_000)
+    executor_case.add_argument("--max-pending", type=int, default=8)
+    executor_case.set_defaults(run=bench_db_executor)
+
+    backup_case = cases.add_parser("backup", help=bench_backup.__doc__)
+    backup_case.add_argument("--mb", type=int, default=2048, help="database size to back up")
+    backup_case.set_defaults(run=bench_backup)
+
+    responses_case = cases.add_parser("responses", help=bench_responses.__doc__)
+    responses_case.add_argument("--cards", type=int, default=2000)
+    responses_case.add_argument("--content-kb", type=int, default=512)
+    responses_case.add_argument("--rounds", type=int, default=20)
+    responses_case.set_defaults(run=bench_responses)
+
+    compare_case = cases.add_parser("compare", help=bench_compare.__doc__)
+    compare_case.add_argument("old")
+    compare_case.add_argument("new")
+    compare_case.set_defaults(run=bench_compare)
+
+    args = parser.parse_args()
+    result = args.run(args)
+    print(json.dumps(result))
+    if result.get("failures"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
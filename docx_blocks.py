@@ -0,0 +1,107 @@
+"""DOCX text extraction in document order.
+
+Imported by main.py, and on its own by the processes that parse large
+files, so it must stay free of import-time side effects: no database,
+storage or LLM client set-up here.
+"""
+
+import io
+from typing import Iterator, List
+
+from docx import Document
+from docx.oxml.ns import qn
+from pydantic import BaseModel
+
+
+class TextBlock(BaseModel):
+    """A structural unit of extracted text, in document order"""
+
+    kind: str  # heading, paragraph, list_item, table or header
+    text: str
+    level: int = 0  # heading level, or nesting depth for list items
+
+
+_DOCX_TEXT_TAGS = {qn("w:t"): None, qn("w:tab"): "\t", qn("w:br"): "\n", qn("w:cr"): "\n"}
+
+
+def _docx_text(element) -> str:
+    # Same result as Paragraph.text without an XPath query per run
+    parts = []
+    for node in element.iter(*_DOCX_TEXT_TAGS):
+        value = _DOCX_TEXT_TAGS[node.tag]
+        parts.append(node.text or "" if value is None else value)
+    return "".join(parts)
+
+
+def _docx_paragraph_block(p, style_names: dict) -> TextBlock | None:
+    text = _docx_text(p).strip()
+    if not text:
+        return None
+    # Resolving Paragraph.style walks the styles part on every call; a
+    # precomputed id -> name map keeps this linear in the document size
+    style = style_names.get(p.style, "")
+    if style == "Title":
+        return TextBlock(kind="heading", text=text, level=1)
+    if style.startswith("Heading"):
+        suffix = style[len("Heading"):].strip()
+        level = int(suffix) if suffix.isdigit() else 1
+        return TextBlock(kind="heading", text=text, level=level)
+
+    p_pr = p.pPr
+    num_pr = p_pr.numPr if p_pr is not None else None
+    if num_pr is not None or style.startswith("List"):
+        level = 0
+        if num_pr is not None and num_pr.ilvl is not None:
+            level = num_pr.ilvl.val
+        return TextBlock(kind="list_item", text=text, level=level)
+    return TextBlock(kind="paragraph", text=text)
+
+
+def _docx_table_block(tbl) -> TextBlock | None:
+    # Walk w:tr/w:tc directly: Table.rows/.cells rebuild the layout grid for
+    # every access, and a merged cell is a single w:tc here
+    rows = []
+    for tr in tbl.tr_lst:
+        cells = [" ".join(_docx_text(tc).split()) for tc in tr.tc_lst]
+        if any(cells):
+            rows.append(" | ".join(cells))
+    if not rows:
+        return None
+    return TextBlock(kind="table", text="\n".join(rows))
+
+
+def iter_docx_blocks(source) -> Iterator[TextBlock]:
+    """Walk a DOCX body in document order: headers, paragraphs, lists, tables.
+
+    source is a path or a binary file object.
+    """
+    doc = Document(source)
+
+    seen_headers = set()
+    for section in doc.sections:
+        header = section.header
+        if header.is_linked_to_previous:
+            continue
+        text = "\n".join(p.text.strip() for p in header.paragraphs if p.text.strip())
+        if text and text not in seen_headers:
+            seen_headers.add(text)
+            yield TextBlock(kind="header", text=text)
+
+    style_names = {style.style_id: style.name for style in doc.styles}
+    paragraph_tag, table_tag = qn("w:p"), qn("w:tbl")
+    for child in doc.element.body.iterchildren():
+        if child.tag == paragraph_tag:
+            block = _docx_paragraph_block(child, style_names)
+        elif child.tag == table_tag:
+            block = _docx_table_block(child)
+        else:
+            continue
+        if block is not None:
+            yield block
+
+
+def extract_docx_blocks(source) -> List[TextBlock]:
+    """All blocks of a DOCX given as a path or as its bytes"""
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    return list(iter_docx_blocks(source))
@@ -0,0 +1,157 @@
+"""Local stand-in for the Gemini generateContent API.
+
+Start it and point the API at it to exercise timeouts, the circuit breaker,
+hedging and model fallback without spending quota:
+
+    python fake_gemini.py --port 8100 --latency 0.5 --error-rate 0.2
+    GEMINI_API_ENDPOINT=http://127.0.0.1:8100 uvicorn main:app
+
+Responses are shaped after the prompt (concepts, flashcards, quiz or study
+plan) so the whole processing pipeline runs end to end.
+"""
+
+import argparse
+import json
+import random
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROUTE = re.compile(r"^/v1beta/models/(?P<model>[^/:]+):generateContent")
+
+
+def concepts_reply(words: int) -> str:
+    return json.dumps(
+        [
+            {
+                "title": f"Concept {i}",
+                "explanation": "lorem " * words,
+                "importance": ["high", "medium", "low"][i % 3],
+            }
+            for i in range(4)
+        ]
+    )
+
+
+def flashcards_reply(words: int) -> str:
+    return json.dumps(
+        [
+            {"question": f"Question {i}?", "answer": "ipsum " * words}
+            for i in range(3)
+        ]
+    )
+
+
+def quiz_reply(words: int, count: int) -> str:
+    return json.dumps(
+        {
+            "questions": [
+                {
+                    "question": f"Question {i}?",
+                    "options": ["A", "B", "C", "D"],
+                    "correct_index": i % 4,
+                    "explanation": "dolor " * words,
+                }
+                for i in range(count)
+            ]
+        }
+    )
+
+
+def reply_for(prompt: str, words: int) -> str:
+    if "key concepts" in prompt:
+        return concepts_reply(words)
+    if "flashcards" in prompt:
+        return flashcards_reply(words)
+    match = re.search(r"Create (\d+) multiple choice", prompt)
+    if match:
+        return quiz_reply(words, int(match.group(1)))
+    return "# Study plan\n\n" + "sit amet " * words
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    options = None
+
+    def log_message(self, format, *args):
+        if self.options.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, status: int, body: dict):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        options = self.options
+        match = ROUTE.match(self.path)
+        if not match:
+            self.send_json(404, {"error": {"code": 404, "message": "not found"}})
+            return
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = " ".join(
+            part.get("text", "")
+            for content in request.get("contents", [])
+            for part in content.get("parts", [])
+        )
+
+        delay = random.expovariate(1 / options.latency) if options.latency else 0
+        if random.random() < options.slow_rate:
+            delay += options.slow_latency
+        time.sleep(delay)
+
+        model = match.group("model")
+        if model in options.fail_models or random.random() < options.error_rate:
+            self.send_json(
+                503, {"error": {"code": 503, "message": "injected failure", "status": "UNAVAILABLE"}}
+            )
+            return
+
+        reply = reply_for(prompt, options.words)
+        prompt_tokens, reply_tokens = len(prompt.split()), len(reply.split())
+        self.send_json(
+            200,
+            {
+                "candidates": [
+                    {
+                        "content": {
+                            "parts": [{"text": reply}],
+                            "role": "model",
+                        },
+                        "finishReason": "STOP",
+                        "index": 0,
+                    }
+                ],
+                "usageMetadata": {
+                    "promptTokenCount": prompt_tokens,
+                    "candidatesTokenCount": reply_tokens,
+                    "totalTokenCount": prompt_tokens + reply_tokens,
+                },
+                "modelVersion": model,
+            },
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.2, help="mean seconds per call")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="fraction of calls hitting the tail")
+    parser.add_argument("--slow-latency", type=float, default=5.0, help="extra seconds for tail calls")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls failing with 503")
+    parser.add_argument("--fail-models", nargs="*", default=[], help="models that always fail")
+    parser.add_argument("--words", type=int, default=20, help="words per generated field")
+    parser.add_argument("--verbose", action="store_true")
+    options = parser.parse_args()
+
+    FakeGeminiHandler.options = options
+    server = ThreadingHTTPServer((options.host, options.port), FakeGeminiHandler)
+    print(f"Fake Gemini listening on http://{options.host}:{options.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()